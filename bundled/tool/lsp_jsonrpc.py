@@ -97,6 +97,7 @@ class JsonRpc:
     def __init__(self, reader: io.TextIOWrapper, writer: io.TextIOWrapper):
         self._reader = JsonReader(reader)
         self._writer = JsonWriter(writer)
+        self._lock = threading.Lock()
 
     def close(self):
         """Closes the underlying streams."""
@@ -117,6 +118,12 @@ class JsonRpc:
         """Receive data in JSON-RPC format."""
         return self._reader.read()
 
+    def send_request(self, data):
+        """Send given data and wait for the response, one request at a time."""
+        with self._lock:
+            self._writer.write(data)
+            return self._reader.read()
+
 
 def create_json_rpc(readable: BinaryIO, writable: BinaryIO) -> JsonRpc:
     """Creates JSON-RPC wrapper for the readable and writable streams."""
@@ -186,6 +193,7 @@ class ProcessManager:
 
 _process_manager = ProcessManager()
 atexit.register(_process_manager.stop_all_processes)
+_start_lock = threading.Lock()
 
 
 def _get_json_rpc(workspace: str) -> Union[JsonRpc, None]:
@@ -204,11 +212,12 @@ def get_or_start_json_rpc(
     env: Optional[Dict[str, str]] = None,
 ) -> Union[JsonRpc, None]:
     """Gets an existing JSON-RPC connection or starts one and return it."""
-    res = _get_json_rpc(workspace)
-    if not res:
-        args = [*interpreter, RUNNER_SCRIPT]
-        _process_manager.start_process(workspace, args, cwd, env)
+    with _start_lock:
         res = _get_json_rpc(workspace)
+        if not res:
+            args = [*interpreter, RUNNER_SCRIPT]
+            _process_manager.start_process(workspace, args, cwd, env)
+            res = _get_json_rpc(workspace)
     return res
 
 
@@ -250,9 +259,7 @@ def run_over_json_rpc(
     if source:
         msg["source"] = source
 
-    rpc.send_data(msg)
-
-    data = rpc.receive_data()
+    data = rpc.send_request(msg)
 
     if data["id"] != msg_id:
         return RpcRunResult(
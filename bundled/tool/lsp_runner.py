@@ -18,7 +18,7 @@ def update_sys_path(path_to_add: str, strategy: str) -> None:
     if path_to_add not in sys.path and os.path.isdir(path_to_add):
         if strategy == "useBundled":
             sys.path.insert(0, path_to_add)
-        else:
+        elif strategy == "fromEnvironment":
             sys.path.append(path_to_add)
 
 
@@ -4,11 +4,14 @@
 from __future__ import annotations
 
 import ast
-import copy
+import functools
+import hashlib
 import json
 import os
 import pathlib
+import re
 import sys
+import threading
 import traceback
 from typing import Any, Dict, List, Optional, Sequence
 
@@ -39,14 +42,32 @@ update_sys_path(os.fspath(pathlib.Path(__file__).parent.parent / "tool"), "useBu
 # **********************************************************
 # pylint: disable=wrong-import-position,import-error
 import isort
+import isort.main
+import isort.settings
 import lsp_jsonrpc as jsonrpc
 import lsp_utils as utils
 import lsprotocol.types as lsp
 from pygls import server, uris, workspace
 
 WORKSPACE_SETTINGS = {}
+# Normalized workspace paths, longest first, for matching documents to settings.
+WORKSPACE_ROOTS: List[str] = []
 GLOBAL_SETTINGS = {}
 RUNNER = pathlib.Path(__file__).parent / "lsp_runner.py"
+# Import strategy for the runner when 'path' runs isort as a module. It keeps
+# the bundled libs off the runner's `sys.path`, so only the isort installed for
+# that interpreter is used, as with running 'path' directly.
+PATH_IMPORT_STRATEGY = "fromPath"
+
+# Maps (document uri, extra args) to the source hash, isort config fingerprint
+# and isort result for them, so unchanged documents are not sent to isort again.
+RUN_RESULTS: Dict[tuple, tuple] = {}
+
+# Pending lint runs per document uri, see `_schedule_linting`.
+LINT_TIMERS: Dict[str, threading.Timer] = {}
+LINT_TIMERS_LOCK = threading.Lock()
+# Seconds to wait for more open/save events before linting a document.
+LINT_DELAY = 0.05
 
 MAX_WORKERS = 5
 LSP_SERVER = server.LanguageServer(
@@ -66,6 +87,14 @@ TOOL_ARGS = []
 # Minimum version of isort supported.
 MIN_VERSION = "5.10.1"
 
+# Matches the start of the first line beginning with an import statement.
+IMPORT_LINE_REGEX = re.compile(r"^(?:import|from)", re.MULTILINE)
+
+# Matches the error line reported by `isort --check` for unsorted imports.
+SORTING_ERROR_REGEX = re.compile(
+    r"^ERROR[^\r\n]*(?i:imports are incorrectly sorted)", re.MULTILINE
+)
+
 # **********************************************************
 # Linting features start here
 # **********************************************************
@@ -74,30 +103,60 @@ MIN_VERSION = "5.10.1"
 @LSP_SERVER.feature(lsp.TEXT_DOCUMENT_DID_OPEN)
 def did_open(params: lsp.DidOpenTextDocumentParams) -> None:
     """LSP handler for textDocument/didOpen request."""
-    document = LSP_SERVER.workspace.get_document(params.text_document.uri)
-    diagnostics: list[lsp.Diagnostic] = _linting_helper(document)
-    LSP_SERVER.publish_diagnostics(document.uri, diagnostics)
+    _schedule_linting(params.text_document.uri)
 
 
 @LSP_SERVER.feature(lsp.TEXT_DOCUMENT_DID_SAVE)
 def did_save(params: lsp.DidSaveTextDocumentParams) -> None:
     """LSP handler for textDocument/didSave request."""
-    document = LSP_SERVER.workspace.get_document(params.text_document.uri)
-    diagnostics: list[lsp.Diagnostic] = _linting_helper(document)
-    LSP_SERVER.publish_diagnostics(document.uri, diagnostics)
+    _schedule_linting(params.text_document.uri)
 
 
 @LSP_SERVER.feature(lsp.TEXT_DOCUMENT_DID_CLOSE)
 def did_close(params: lsp.DidCloseTextDocumentParams) -> None:
     """LSP handler for textDocument/didClose request."""
     document = LSP_SERVER.workspace.get_document(params.text_document.uri)
+    with LINT_TIMERS_LOCK:
+        timer = LINT_TIMERS.pop(document.uri, None)
+    if timer:
+        timer.cancel()
+    for key in list(RUN_RESULTS):
+        if key[0] == document.uri:
+            RUN_RESULTS.pop(key, None)
     # Publishing empty diagnostics to clear the entries for this file.
     LSP_SERVER.publish_diagnostics(document.uri, [])
 
 
+def _schedule_linting(uri: str) -> None:
+    """Lints the document after `LINT_DELAY`, so bursts of events run isort once."""
+    timer = threading.Timer(LINT_DELAY, _lint_and_publish, args=(uri,))
+    timer.daemon = True
+    with LINT_TIMERS_LOCK:
+        pending = LINT_TIMERS.get(uri)
+        if pending:
+            pending.cancel()
+        LINT_TIMERS[uri] = timer
+    timer.start()
+
+
+def _lint_and_publish(uri: str) -> None:
+    with LINT_TIMERS_LOCK:
+        if LINT_TIMERS.get(uri) is threading.current_thread():
+            del LINT_TIMERS[uri]
+    document = LSP_SERVER.workspace.get_document(uri)
+    version = document.version
+    diagnostics: list[lsp.Diagnostic] = _linting_helper(document)
+
+    current = LSP_SERVER.workspace.text_documents.get(uri)
+    if current is None or current.version != version:
+        # The document was closed or edited while isort was running, so these
+        # diagnostics no longer match its contents.
+        return
+    LSP_SERVER.publish_diagnostics(document.uri, diagnostics)
+
+
 def _linting_helper(document: workspace.Document) -> list[lsp.Diagnostic]:
-    # deep copy here to prevent accidentally updating global settings.
-    settings = copy.deepcopy(_get_settings_by_document(document))
+    settings = _get_settings_by_document(document)
 
     if not settings.get("check", False):
         # If sorting check is disabled, return empty diagnostics.
@@ -128,13 +187,6 @@ def _get_severity(code_type: str, severity: Dict[str, str]) -> lsp.DiagnosticSev
     return lsp.DiagnosticSeverity.Warning
 
 
-def _is_sorting_error(line: str) -> bool:
-    return (
-        line.startswith("ERROR")
-        and line.lower().find("imports are incorrectly sorted") > 0
-    )
-
-
 def _parse_output(
     document: workspace.Document,
     output: str,
@@ -142,19 +194,10 @@ def _parse_output(
 ) -> Sequence[lsp.Diagnostic]:
     """Parses isort messages and return LSP diagnostic object for each message."""
     diagnostics = []
-    has_error = any(
-        [_is_sorting_error(line) for line in output.splitlines(keepends=False)]
-    )
-
-    if has_error:
-        try:
-            import_line = [
-                i
-                for i, l in enumerate(document.lines)
-                if l.startswith("import") or l.startswith("from")
-            ][0]
-        except IndexError:
-            import_line = 0
+    if SORTING_ERROR_REGEX.search(output):
+        source = document.source
+        match = IMPORT_LINE_REGEX.search(source)
+        import_line = source.count("\n", 0, match.start()) if match else 0
 
         diagnostics.append(
             lsp.Diagnostic(
@@ -197,6 +240,7 @@ def _parse_output(
         resolve_provider=True,
     ),
 )
+@LSP_SERVER.thread()
 def code_action_organize_imports(params: lsp.CodeActionParams):
     text_document = LSP_SERVER.workspace.get_document(params.text_document.uri)
 
@@ -264,6 +308,7 @@ def code_action_organize_imports(params: lsp.CodeActionParams):
 
 
 @LSP_SERVER.feature(lsp.CODE_ACTION_RESOLVE)
+@LSP_SERVER.thread()
 def code_action_resolve(params: lsp.CodeAction):
     text_document = LSP_SERVER.workspace.get_document(params.data)
 
@@ -280,7 +325,9 @@ def code_action_resolve(params: lsp.CodeAction):
             lsp.TextEdit(
                 range=lsp.Range(
                     start=lsp.Position(line=0, character=0),
-                    end=lsp.Position(line=len(text_document.lines), character=0),
+                    end=lsp.Position(
+                        line=_get_line_count(text_document.source), character=0
+                    ),
                 ),
                 new_text=text_document.source,
             )
@@ -290,6 +337,7 @@ def code_action_resolve(params: lsp.CodeAction):
     return params
 
 
+@functools.lru_cache(maxsize=64)
 def is_python(code: str) -> bool:
     """Ensures that the code provided is python."""
     try:
@@ -307,7 +355,7 @@ def is_interactive(file_path: str) -> bool:
 
 def _formatting_helper(document: workspace.Document) -> list[lsp.TextEdit] | None:
     result = _run_tool_on_document(document, use_stdin=True)
-    if result.stdout:
+    if result and result.stdout:
         new_source = _match_line_endings(document, result.stdout)
 
         # Skip last line ending in a notebook cell
@@ -322,7 +370,9 @@ def _formatting_helper(document: workspace.Document) -> list[lsp.TextEdit] | Non
                 lsp.TextEdit(
                     range=lsp.Range(
                         start=lsp.Position(line=0, character=0),
-                        end=lsp.Position(line=len(document.lines), character=0),
+                        end=lsp.Position(
+                            line=_get_line_count(document.source), character=0
+                        ),
                     ),
                     new_text=new_source,
                 )
@@ -330,6 +380,47 @@ def _formatting_helper(document: workspace.Document) -> list[lsp.TextEdit] | Non
     return None
 
 
+def _get_config_fingerprint(document_path: str) -> tuple:
+    """Returns the stat of every isort config file that may apply to the document."""
+    # isort looks for its config from the document directory upwards, stopping
+    # at the repository root, so cached results must not outlive edits to any
+    # of these files. Every candidate is included, even those without an isort
+    # section, which at worst costs an extra isort run.
+    fingerprint = []
+    directory = os.path.dirname(document_path)
+    for _ in range(isort.settings.MAX_CONFIG_SEARCH_DEPTH):
+        for name in isort.settings.CONFIG_SOURCES:
+            config_path = os.path.join(directory, name)
+            try:
+                stat = os.stat(config_path)
+            except OSError:
+                continue
+            fingerprint.append((config_path, stat.st_mtime_ns, stat.st_size))
+
+        if any(
+            os.path.isdir(os.path.join(directory, stop_dir))
+            for stop_dir in isort.settings.STOP_CONFIG_SEARCH_ON_DIRS
+        ):
+            break
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return tuple(fingerprint)
+
+
+def _has_settings_path(args: Sequence[str]) -> bool:
+    """Checks if the isort args point it at an explicit settings file or path."""
+    return any(arg.startswith(("--settings", "--sp")) for arg in args)
+
+
+def _get_source_hash(source: str) -> bytes:
+    """Returns a short digest used to detect unchanged document sources."""
+    return hashlib.blake2b(
+        source.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+
+
 def _create_workspace_edits(
     document: workspace.Document, results: Optional[List[lsp.TextEdit]]
 ):
@@ -346,20 +437,29 @@ def _create_workspace_edits(
     )
 
 
-def _get_line_endings(lines: list[str]) -> str:
+def _get_line_count(text: str) -> int:
+    """Returns the number of lines in the text without splitting it into lines."""
+    # LSP line endings are '\n', '\r\n' and '\r'.
+    count = text.count("\n") + text.count("\r") - text.count("\r\n")
+    if text and text[-1] not in "\r\n":
+        count += 1
+    return count
+
+
+def _get_line_endings(text: str) -> str | None:
     """Returns line endings used in the text."""
-    try:
-        if lines[0][-2:] == "\r\n":
-            return "\r\n"
-        return "\n"
-    except Exception:  # pylint: disable=broad-except
+    index = text.find("\n")
+    if index < 0:
         return None
+    if index > 0 and text[index - 1] == "\r":
+        return "\r\n"
+    return "\n"
 
 
 def _match_line_endings(document: workspace.Document, text: str) -> str:
     """Ensures that the edited text line endings matches the document line endings."""
-    expected = _get_line_endings(document.source.splitlines(keepends=True))
-    actual = _get_line_endings(text.splitlines(keepends=True))
+    expected = _get_line_endings(document.source)
+    actual = _get_line_endings(text)
     if actual == expected or actual is None or expected is None:
         return text
     return text.replace(actual, expected)
@@ -418,7 +518,6 @@ def _log_version_info(settings: Dict[str, str]) -> None:
     try:
         from packaging.version import parse as parse_version
 
-        settings = copy.deepcopy(settings)
         result = _run_tool(["--version-number"], settings)
         code_workspace = settings["workspaceFS"]
 
@@ -453,7 +552,6 @@ def _log_version_info(settings: Dict[str, str]) -> None:
 def _log_verbose_config(settings: Dict[str, str]) -> None:
     if LSP_SERVER.lsp.trace == lsp.TraceValues.Verbose:
         try:
-            settings = copy.deepcopy(settings)
             result = _run_tool(["--show-config"], settings)
             code_workspace = settings["workspaceFS"]
             log_to_output(
@@ -481,6 +579,8 @@ def _get_global_defaults():
 
 
 def _update_workspace_settings(settings):
+    _get_settings_by_document_path.cache_clear()
+    RUN_RESULTS.clear()
     if not settings:
         key = utils.normalize_path(os.getcwd())
         WORKSPACE_SETTINGS[key] = {
@@ -489,52 +589,43 @@ def _update_workspace_settings(settings):
             "workspace": uris.from_fs_path(key),
             **_get_global_defaults(),
         }
-        return
-
-    for setting in settings:
-        key = utils.normalize_path(uris.to_fs_path(setting["workspace"]))
-        WORKSPACE_SETTINGS[key] = {
-            **setting,
-            "workspaceFS": key,
-        }
-
-
-def _get_settings_by_path(file_path: pathlib.Path):
-    workspaces = {s["workspaceFS"] for s in WORKSPACE_SETTINGS.values()}
-
-    while file_path != file_path.parent:
-        str_file_path = utils.normalize_path(file_path)
-        if str_file_path in workspaces:
-            return WORKSPACE_SETTINGS[str_file_path]
-        file_path = file_path.parent
-
-    setting_values = list(WORKSPACE_SETTINGS.values())
-    return setting_values[0]
-
-
-def _get_document_key(document: workspace.Document):
-    if WORKSPACE_SETTINGS:
-        document_workspace = pathlib.Path(document.path)
-        workspaces = {s["workspaceFS"] for s in WORKSPACE_SETTINGS.values()}
-
-        # Find workspace settings for the given file.
-        while document_workspace != document_workspace.parent:
-            norm_path = utils.normalize_path(document_workspace)
-            if norm_path in workspaces:
-                return norm_path
-            document_workspace = document_workspace.parent
-
+    else:
+        for setting in settings:
+            key = utils.normalize_path(uris.to_fs_path(setting["workspace"]))
+            WORKSPACE_SETTINGS[key] = {
+                **setting,
+                "workspaceFS": key,
+            }
+
+    WORKSPACE_ROOTS[:] = sorted(WORKSPACE_SETTINGS, key=len, reverse=True)
+
+
+def _get_document_key(document_path: str):
+    # Roots are sorted longest first, so the innermost workspace wins.
+    document_dir = utils.normalize_path(pathlib.Path(document_path).parent)
+    for root in WORKSPACE_ROOTS:
+        if document_dir == root or document_dir.startswith(
+            root.rstrip(os.sep) + os.sep
+        ):
+            return root
     return None
 
 
 def _get_settings_by_document(document: workspace.Document | None):
     if document is None or document.path is None:
-        return list(WORKSPACE_SETTINGS.values())[0]
+        return next(iter(WORKSPACE_SETTINGS.values()))
+
+    return _get_settings_by_document_path(document.path)
 
-    key = _get_document_key(document)
+
+@functools.lru_cache(maxsize=1024)
+def _get_settings_by_document_path(document_path: str):
+    # Cached since resolving the document directory touches the file system.
+    # The cache is cleared when workspace settings are updated.
+    key = _get_document_key(document_path)
     if key is None:
         # This is either a non-workspace file or there is no workspace.
-        key = utils.normalize_path(pathlib.Path(document.path).parent)
+        key = utils.normalize_path(pathlib.Path(document_path).parent)
         return {
             "cwd": key,
             "workspaceFS": key,
@@ -567,22 +658,42 @@ def _run_tool_on_document(
         log_warning(f"Skipping interactive window: {document.path}")
         return None
 
-    if not is_python(document.source):
+    settings = _get_settings_by_document(document)
+
+    use_cache = use_stdin and not _has_settings_path(settings["args"])
+    if use_cache:
+        cache_key = (document.uri, tuple(extra_args))
+        source_hash = _get_source_hash(document.source)
+        config = _get_config_fingerprint(document.path)
+        cached = RUN_RESULTS.get(cache_key)
+        if cached and cached[:2] == (source_hash, config):
+            return cached[2]
+
+    # Only content without a python file extension, like notebook cells,
+    # needs to be checked.
+    if not document.path.endswith(".py") and not is_python(document.source):
         log_warning(f"Skipping non python code: {document.path}")
         return None
 
-    # deep copy here to prevent accidentally updating global settings.
-    settings = copy.deepcopy(_get_settings_by_document(document))
-
-    code_workspace = settings["workspaceFS"]
     cwd = settings["workspaceFS"]
 
     use_path = False
     use_rpc = False
-    if settings["path"]:
+    interpreter = settings["interpreter"]
+    import_strategy = settings["importStrategy"]
+    module_path = _split_module_path(settings["path"])
+    if module_path:
+        # 'path' runs isort as a module (e.g. `python -m isort`), so use the
+        # long-lived JSON-RPC runner under that interpreter instead of starting
+        # a new process for every request.
+        interpreter, argv = module_path
+        import_strategy = PATH_IMPORT_STRATEGY
+        use_rpc = True
+    elif settings["path"]:
         # 'path' setting takes priority over everything.
         use_path = True
-        argv = settings["path"]
+        # Copy, since `argv` is extended below and settings are shared.
+        argv = list(settings["path"])
     elif settings["interpreter"] and not utils.is_current_interpreter(
         settings["interpreter"][0]
     ):
@@ -611,8 +722,7 @@ def _run_tool_on_document(
 
     if use_path:
         # This mode is used when running executables.
-        log_to_output(" ".join(argv))
-        log_to_output(f"CWD Server: {cwd}")
+        log_to_output(" ".join(argv) + f"\r\nCWD Server: {cwd}")
         result = utils.run_path(
             argv=argv,
             use_stdin=use_stdin,
@@ -624,30 +734,43 @@ def _run_tool_on_document(
     elif use_rpc:
         # This mode is used if the interpreter running this server is different from
         # the interpreter used for running this server.
-        log_to_output(" ".join(settings["interpreter"] + ["-m"] + argv))
-        log_to_output(f"CWD Linter: {cwd}")
+        log_to_output(" ".join(interpreter + ["-m"] + argv) + f"\r\nCWD Linter: {cwd}")
 
-        result = jsonrpc.run_over_json_rpc(
-            workspace=code_workspace,
-            interpreter=settings["interpreter"],
-            module=TOOL_MODULE,
-            argv=argv,
-            use_stdin=use_stdin,
-            cwd=cwd,
-            source=source,
-            env={
-                "LS_IMPORT_STRATEGY": settings["importStrategy"],
-            },
-        )
-        result = _to_run_result_with_logging(result)
+        try:
+            result = jsonrpc.run_over_json_rpc(
+                workspace=_get_rpc_worker_key(interpreter, import_strategy),
+                interpreter=interpreter,
+                module=TOOL_MODULE,
+                argv=argv,
+                use_stdin=use_stdin,
+                cwd=cwd,
+                source=source,
+                env={
+                    "LS_IMPORT_STRATEGY": import_strategy,
+                },
+            )
+        except Exception:
+            if not module_path:
+                raise
+            # The runner is not usable, so fall back to running 'path' directly.
+            log_warning(traceback.format_exc(chain=True))
+            result = utils.run_path(
+                argv=interpreter + ["-m"] + argv,
+                use_stdin=use_stdin,
+                cwd=cwd,
+                source=source,
+            )
+        else:
+            result = _to_run_result_with_logging(result)
     else:
-        # In this mode the tool is run as a module in the same process as the language server.
-        log_to_output(" ".join([sys.executable, "-m"] + argv))
-        log_to_output(f"CWD Linter: {cwd}")
+        # In this mode isort is called directly in the same process as the language server.
+        log_to_output(
+            " ".join([sys.executable, "-m"] + argv) + f"\r\nCWD Linter: {cwd}"
+        )
 
         try:
-            result = utils.run_module(
-                module=TOOL_MODULE,
+            result = utils.run_api(
+                callback=_run_isort_main,
                 argv=argv,
                 use_stdin=use_stdin,
                 cwd=cwd,
@@ -665,20 +788,32 @@ def _run_tool_on_document(
         if result.stderr:
             log_to_output(result.stderr)
 
+    if use_cache and (not result.stderr or SORTING_ERROR_REGEX.search(result.stderr)):
+        # Only keep results that reflect the source, not a failure to run isort.
+        RUN_RESULTS[cache_key] = (source_hash, config, result)
+
     return result
 
 
 def _run_tool(extra_args: Sequence[str], settings: Dict[str, Any]) -> utils.RunResult:
     """Runs tool."""
-    code_workspace = settings["workspaceFS"]
     cwd = settings["workspaceFS"]
 
     use_path = False
     use_rpc = False
-    if len(settings["path"]) > 0:
+    interpreter = settings["interpreter"]
+    import_strategy = settings["importStrategy"]
+    module_path = _split_module_path(settings["path"])
+    if module_path:
+        # 'path' runs isort as a module, see `_run_tool_on_document`.
+        interpreter, argv = module_path
+        import_strategy = PATH_IMPORT_STRATEGY
+        use_rpc = True
+    elif len(settings["path"]) > 0:
         # 'path' setting takes priority over everything.
         use_path = True
-        argv = settings["path"]
+        # Copy, since `argv` is extended below and settings are shared.
+        argv = list(settings["path"])
     elif len(settings["interpreter"]) > 0 and not utils.is_current_interpreter(
         settings["interpreter"][0]
     ):
@@ -695,38 +830,47 @@ def _run_tool(extra_args: Sequence[str], settings: Dict[str, Any]) -> utils.RunR
 
     if use_path:
         # This mode is used when running executables.
-        log_to_output(" ".join(argv))
-        log_to_output(f"CWD Server: {cwd}")
+        log_to_output(" ".join(argv) + f"\r\nCWD Server: {cwd}")
         result = utils.run_path(argv=argv, use_stdin=True, cwd=cwd)
         if result.stderr:
             log_to_output(result.stderr)
     elif use_rpc:
         # This mode is used if the interpreter running this server is different from
         # the interpreter used for running this server.
-        log_to_output(" ".join(settings["interpreter"] + ["-m"] + argv))
-        log_to_output(f"CWD Linter: {cwd}")
-        result = jsonrpc.run_over_json_rpc(
-            workspace=code_workspace,
-            interpreter=settings["interpreter"],
-            module=TOOL_MODULE,
-            argv=argv,
-            use_stdin=True,
-            cwd=cwd,
-            env={
-                "LS_IMPORT_STRATEGY": settings["importStrategy"],
-            },
-        )
-        result = _to_run_result_with_logging(result)
+        log_to_output(" ".join(interpreter + ["-m"] + argv) + f"\r\nCWD Linter: {cwd}")
+        try:
+            result = jsonrpc.run_over_json_rpc(
+                workspace=_get_rpc_worker_key(interpreter, import_strategy),
+                interpreter=interpreter,
+                module=TOOL_MODULE,
+                argv=argv,
+                use_stdin=True,
+                cwd=cwd,
+                env={
+                    "LS_IMPORT_STRATEGY": import_strategy,
+                },
+            )
+        except Exception:
+            if not module_path:
+                raise
+            # The runner is not usable, so fall back to running 'path' directly.
+            log_warning(traceback.format_exc(chain=True))
+            result = utils.run_path(
+                argv=interpreter + ["-m"] + argv, use_stdin=True, cwd=cwd
+            )
+        else:
+            result = _to_run_result_with_logging(result)
     else:
-        # In this mode the tool is run as a module in the same process as the language server.
-        log_to_output(" ".join([sys.executable, "-m"] + argv))
-        log_to_output(f"CWD Linter: {cwd}")
+        # In this mode isort is called directly in the same process as the language server.
+        log_to_output(
+            " ".join([sys.executable, "-m"] + argv) + f"\r\nCWD Linter: {cwd}"
+        )
         # This is needed to preserve sys.path, in cases where the tool modifies
         # sys.path and that might not work for this scenario next time around.
         with utils.substitute_attr(sys, "path", [""] + sys.path[:]):
             try:
-                result = utils.run_module(
-                    module=TOOL_MODULE, argv=argv, use_stdin=True, cwd=cwd
+                result = utils.run_api(
+                    callback=_run_isort_main, argv=argv, use_stdin=True, cwd=cwd
                 )
             except Exception:
                 log_error(traceback.format_exc(chain=True))
@@ -737,6 +881,38 @@ def _run_tool(extra_args: Sequence[str], settings: Dict[str, Any]) -> utils.RunR
     return result
 
 
+def _run_isort_main(
+    argv: Sequence[str],
+    _output: utils.CustomIO,
+    _error: utils.CustomIO,
+    _input: utils.CustomIO | None = None,
+) -> None:
+    """Calls isort's CLI entry point directly, instead of going through runpy."""
+    isort.main.main(argv[1:], stdin=_input)
+
+
+def _split_module_path(
+    path: Sequence[str],
+) -> tuple[list[str], list[str]] | None:
+    """Splits a `path` setting like `python -m isort` into interpreter and argv.
+
+    Returns None if `path` does not run isort as a module.
+    """
+    for i in range(1, len(path) - 1):
+        if path[i] == "-m" and path[i + 1] == TOOL_MODULE:
+            return list(path[:i]), list(path[i + 1 :])
+    return None
+
+
+def _get_rpc_worker_key(interpreter: Sequence[str], import_strategy: str) -> str:
+    """Returns the key of the JSON-RPC worker to use for the given interpreter.
+
+    The working directory is sent with every request, so one worker is shared
+    by all workspaces that use the same interpreter and import strategy.
+    """
+    return json.dumps([*interpreter, import_strategy])
+
+
 def _to_run_result_with_logging(rpc_result: jsonrpc.RpcRunResult) -> utils.RunResult:
     error = ""
     if rpc_result.exception:
@@ -751,6 +927,14 @@ def _to_run_result_with_logging(rpc_result: jsonrpc.RpcRunResult) -> utils.RunRe
 # *****************************************************
 # Logging and notification.
 # *****************************************************
+# The extension sets this when starting the server, and restarts the server
+# when it changes, so it is only read once.
+SHOW_NOTIFICATION = os.getenv("LS_SHOW_NOTIFICATION", "off")
+NOTIFY_ON_ERROR = SHOW_NOTIFICATION in ["onError", "onWarning", "always"]
+NOTIFY_ON_WARNING = SHOW_NOTIFICATION in ["onWarning", "always"]
+NOTIFY_ALWAYS = SHOW_NOTIFICATION in ["always"]
+
+
 def log_to_output(
     message: str, msg_type: lsp.MessageType = lsp.MessageType.Log
 ) -> None:
@@ -761,21 +945,21 @@ def log_to_output(
 def log_error(message: str) -> None:
     """Logs messages with notification on error."""
     LSP_SERVER.show_message_log(message, lsp.MessageType.Error)
-    if os.getenv("LS_SHOW_NOTIFICATION", "off") in ["onError", "onWarning", "always"]:
+    if NOTIFY_ON_ERROR:
         LSP_SERVER.show_message(message, lsp.MessageType.Error)
 
 
 def log_warning(message: str) -> None:
     """Logs messages with notification on warning."""
     LSP_SERVER.show_message_log(message, lsp.MessageType.Warning)
-    if os.getenv("LS_SHOW_NOTIFICATION", "off") in ["onWarning", "always"]:
+    if NOTIFY_ON_WARNING:
         LSP_SERVER.show_message(message, lsp.MessageType.Warning)
 
 
 def log_always(message: str) -> None:
     """Logs messages with notification."""
     LSP_SERVER.show_message_log(message, lsp.MessageType.Info)
-    if os.getenv("LS_SHOW_NOTIFICATION", "off") in ["always"]:
+    if NOTIFY_ALWAYS:
         LSP_SERVER.show_message(message, lsp.MessageType.Info)
 
 
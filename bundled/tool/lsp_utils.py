@@ -4,6 +4,7 @@
 from __future__ import annotations
 
 import contextlib
+import functools
 import io
 import os
 import pathlib
@@ -50,13 +51,15 @@ def _get_extensions_dir() -> List[str]:
     return []
 
 
-_stdlib_paths = set(
-    str(pathlib.Path(p).resolve())
-    for p in (
-        as_list(site.getsitepackages())
-        + as_list(site.getusersitepackages())
-        + _get_sys_config_paths()
-        + _get_extensions_dir()
+_stdlib_paths = tuple(
+    set(
+        str(pathlib.Path(p).resolve())
+        for p in (
+            as_list(site.getsitepackages())
+            + as_list(site.getusersitepackages())
+            + _get_sys_config_paths()
+            + _get_extensions_dir()
+        )
     )
 )
 
@@ -71,15 +74,17 @@ def normalize_path(file_path: str) -> str:
     return str(pathlib.Path(file_path).resolve())
 
 
+@functools.lru_cache(maxsize=64)
 def is_current_interpreter(executable) -> bool:
     """Returns true if the executable path is same as the current interpreter."""
     return is_same_path(executable, sys.executable)
 
 
+@functools.lru_cache(maxsize=4096)
 def is_stdlib_file(file_path: str) -> bool:
     """Return True if the file belongs to the standard library."""
     normalized_path = str(pathlib.Path(file_path).resolve())
-    return any(normalized_path.startswith(path) for path in _stdlib_paths)
+    return normalized_path.startswith(_stdlib_paths)
 
 
 # pylint: disable-next=too-few-public-methods
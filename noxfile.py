@@ -4,13 +4,28 @@
 All the action we need during build
 """
 
+import http.client
 import json
 import pathlib
 import re
-import urllib.request as url_lib
+import threading
+import urllib.error
+import urllib.parse as url_parse
+from concurrent.futures import ThreadPoolExecutor
 
 import nox
 
+EXTENSION_ROOT = pathlib.Path(__file__).parent
+PACKAGE_JSON_PATH = EXTENSION_ROOT / "package.json"
+REQUIREMENTS_PATH = EXTENSION_ROOT / "requirements.txt"
+README_PATH = EXTENSION_ROOT / "README.md"
+NPM_REGISTRY_HOST = "registry.npmjs.org"
+
+# Matches the `module=version` reference to the bundled formatter in README.md.
+README_VERSION_REGEX = re.compile(
+    r"\`([a-zA-Z0-9]+)=([0-9]+\.[0-9]+\.[0-9]+)\`", re.MULTILINE
+)
+
 
 def _update_pip_packages(session: nox.Session) -> None:
     session.run(
@@ -29,10 +44,46 @@ def _update_pip_packages(session: nox.Session) -> None:
     )
 
 
-def _get_package_data(package):
-    json_uri = f"https://registry.npmjs.org/{package}"
-    with url_lib.urlopen(json_uri) as response:
-        return json.loads(response.read())
+def _load_package_json() -> dict:
+    return json.loads(PACKAGE_JSON_PATH.read_text(encoding="utf-8"))
+
+
+# One keep-alive connection per worker thread, so lookups do not each pay for a
+# new TLS handshake.
+_registry = threading.local()
+
+
+def _get_registry_json(path: str):
+    if not hasattr(_registry, "connection"):
+        _registry.connection = http.client.HTTPSConnection(
+            NPM_REGISTRY_HOST, timeout=30
+        )
+    _registry.connection.request("GET", path)
+    response = _registry.connection.getresponse()
+    # Read the body even on errors, so the connection can be reused.
+    content = response.read()
+    if response.status != 200:
+        raise urllib.error.HTTPError(
+            f"https://{NPM_REGISTRY_HOST}{path}",
+            response.status,
+            response.reason,
+            response.headers,
+            None,
+        )
+    return json.loads(content)
+
+
+def _get_dist_tags(package):
+    # Scoped packages need the "/" escaped, e.g. "@types%2Fnode".
+    name = url_parse.quote(package, safe="@")
+    try:
+        # Only the dist-tags are needed, which is much smaller than the full
+        # package document with every published version.
+        return _get_registry_json(f"/-/package/{name}/dist-tags")
+    except urllib.error.HTTPError as error:
+        if error.code != 404:
+            raise
+    return _get_registry_json(f"/{name}")["dist-tags"]
 
 
 def _update_npm_packages(session: nox.Session) -> None:
@@ -41,20 +92,20 @@ def _update_npm_packages(session: nox.Session) -> None:
         "@types/vscode",
         "@types/node",
     }
-    package_json_path = pathlib.Path(__file__).parent / "package.json"
-    package_json = json.loads(package_json_path.read_text(encoding="utf-8"))
-
-    for package in package_json["dependencies"]:
-        if package not in pinned:
-            data = _get_package_data(package)
-            latest = "^" + data["dist-tags"]["latest"]
-            package_json["dependencies"][package] = latest
-
-    for package in package_json["devDependencies"]:
-        if package not in pinned:
-            data = _get_package_data(package)
-            latest = "^" + data["dist-tags"]["latest"]
-            package_json["devDependencies"][package] = latest
+    package_json = _load_package_json()
+
+    to_update = [
+        (section, package)
+        for section in ("dependencies", "devDependencies")
+        for package in package_json[section]
+        if package not in pinned
+    ]
+    # Registry lookups are independent, so fetch them concurrently.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = executor.map(_get_dist_tags, [package for _, package in to_update])
+        for (section, package), dist_tags in zip(to_update, results):
+            latest = "^" + dist_tags["latest"]
+            package_json[section][package] = latest
 
     # Ensure engine matches the package
     if (
@@ -69,7 +120,7 @@ def _update_npm_packages(session: nox.Session) -> None:
     # JSON dumps uses \n for line ending on all platforms by default
     if not new_package_json.endswith("\n"):
         new_package_json += "\n"
-    package_json_path.write_text(new_package_json, encoding="utf-8")
+    PACKAGE_JSON_PATH.write_text(new_package_json, encoding="utf-8")
 
     session.run("npm", "audit", "fix", external=True, success_codes=[0, 1])
     session.run("npm", "install", external=True)
@@ -82,7 +133,7 @@ def install_bundled_libs(session):
     session.install(
         "-t",
         "./bundled/libs",
-        "--no-cache-dir",
+        "--only-binary=:all:",
         "--implementation",
         "py",
         "--no-deps",
@@ -96,10 +147,10 @@ def install_bundled_libs(session):
 def tests(session):
     """Runs all the tests for the extension."""
     session.install("-r", "src/test/python_tests/requirements.txt")
-    session.run("pytest", "src/test/python_tests")
+    session.run("pytest", "-n", "auto", "src/test/python_tests")
 
     session.install("freezegun")
-    session.run("pytest", "build")
+    session.run("pytest", "-n", "auto", "build")
 
 
 @nox.session()
@@ -107,27 +158,24 @@ def lint(session):
     """Runs linter and formatter checks on python files."""
     session.install("-r", "src/test/python_tests/requirements.txt")
 
+    # Check all paths in one run per tool, so each tool only starts once.
+    paths = ["./bundled/tool", "./src/test/python_tests", "noxfile.py"]
+
     session.install("flake8")
-    session.run("flake8", "./bundled/tool")
     session.run(
         "flake8",
         "--extend-exclude",
         "./src/test/python_tests/test_data",
-        "./src/test/python_tests",
+        *paths,
     )
-    session.run("flake8", "noxfile.py")
 
     # check formatting using black
     session.install("black")
-    session.run("black", "--check", "./bundled/tool")
-    session.run("black", "--check", "./src/test/python_tests")
-    session.run("black", "--check", "noxfile.py")
+    session.run("black", "--check", *paths)
 
     # check import sorting using isort
     session.install("isort")
-    session.run("isort", "--check", "./bundled/tool")
-    session.run("isort", "--check", "./src/test/python_tests")
-    session.run("isort", "--check", "noxfile.py")
+    session.run("isort", "--check", *paths)
 
 
 @nox.session()
@@ -137,12 +185,11 @@ def update_build_number(session):
         session.log("No updates to package version")
         return
 
-    package_json_path = pathlib.Path(__file__).parent / "package.json"
-    session.log(f"Reading package.json at: {package_json_path}")
+    session.log(f"Reading package.json at: {PACKAGE_JSON_PATH}")
 
-    package_json = json.loads(package_json_path.read_text(encoding="utf-8"))
+    package_json = _load_package_json()
 
-    parts = re.split("\\.|-", package_json["version"])
+    parts = package_json["version"].replace("-", ".").split(".")
     major, minor = parts[:2]
 
     version = f"{major}.{minor}.{session.posargs[0]}"
@@ -150,45 +197,37 @@ def update_build_number(session):
 
     session.log(f"Updating version from {package_json['version']} to {version}")
     package_json["version"] = version
-    package_json_path.write_text(json.dumps(package_json, indent=4), encoding="utf-8")
+    PACKAGE_JSON_PATH.write_text(json.dumps(package_json, indent=4), encoding="utf-8")
 
 
 def _get_module_name() -> str:
-    package_json_path = pathlib.Path(__file__).parent / "package.json"
-    package_json = json.loads(package_json_path.read_text(encoding="utf-8"))
-    return package_json["serverInfo"]["module"]
+    return _load_package_json()["serverInfo"]["module"]
 
 
 @nox.session()
 def validate_readme(session: nox.Session) -> None:
     """Ensures the formatter version in 'requirements.txt' matches 'readme.md'."""
-    requirements_file = pathlib.Path(__file__).parent / "requirements.txt"
-    readme_file = pathlib.Path(__file__).parent / "README.md"
-
-    lines = requirements_file.read_text(encoding="utf-8").splitlines(keepends=False)
+    lines = REQUIREMENTS_PATH.read_text(encoding="utf-8").splitlines(keepends=False)
     module = _get_module_name()
-    formatter_ver = list(line for line in lines if line.startswith(module))[0]
+    formatter_ver = next(line for line in lines if line.startswith(module))
     name, version = formatter_ver.split(" ")[0].split("==")
 
     session.log(f"Looking for {name}={version} in README.md")
-    content = readme_file.read_text(encoding="utf-8")
+    content = README_PATH.read_text(encoding="utf-8")
     if f"{name}={version}" not in content:
         raise ValueError(f"Formatter info {name}={version} was not found in README.md.")
     session.log(f"FOUND {name}={version} in README.md")
 
 
 def _update_readme() -> None:
-    requirements_file = pathlib.Path(__file__).parent / "requirements.txt"
-    lines = requirements_file.read_text(encoding="utf-8").splitlines(keepends=False)
+    lines = REQUIREMENTS_PATH.read_text(encoding="utf-8").splitlines(keepends=False)
     module = _get_module_name()
-    formatter_ver = list(line for line in lines if line.startswith(module))[0]
+    formatter_ver = next(line for line in lines if line.startswith(module))
     _, version = formatter_ver.split(" ")[0].split("==")
 
-    readme_file = pathlib.Path(__file__).parent / "README.md"
-    content = readme_file.read_text(encoding="utf-8")
-    regex = r"\`([a-zA-Z0-9]+)=([0-9]+\.[0-9]+\.[0-9]+)\`"
-    result = re.sub(regex, f"`{module}={version}`", content, 0, re.MULTILINE)
-    content = readme_file.write_text(result, encoding="utf-8")
+    content = README_PATH.read_text(encoding="utf-8")
+    result = README_VERSION_REGEX.sub(f"`{module}={version}`", content)
+    content = README_PATH.write_text(result, encoding="utf-8")
 
 
 @nox.session()
@@ -13,7 +13,7 @@ VSCODE_DEFAULT_INITIALIZE = {
     "processId": os.getpid(),
     "clientInfo": {"name": "vscode", "version": "1.45.0"},
     "rootPath": str(PROJECT_ROOT),
-    "rootUri": as_uri(str(PROJECT_ROOT)),
+    "rootUri": as_uri(PROJECT_ROOT),
     "capabilities": {
         "workspace": {
             "applyEdit": True,
@@ -214,6 +214,21 @@ VSCODE_DEFAULT_INITIALIZE = {
         "window": {"workDoneProgress": True},
     },
     "trace": "verbose",
-    "workspaceFolders": [{"uri": as_uri(str(PROJECT_ROOT)), "name": "my_project"}],
+    "workspaceFolders": [{"uri": as_uri(PROJECT_ROOT), "name": "my_project"}],
     "initializationOptions": get_initialization_options(),
 }
+
+
+def initialize_params(**settings):
+    """Returns the default initialize params with the given settings overridden.
+
+    Only the settings are copied, the rest is shared with the defaults.
+    """
+    options = VSCODE_DEFAULT_INITIALIZE["initializationOptions"]
+    return {
+        **VSCODE_DEFAULT_INITIALIZE,
+        "initializationOptions": {
+            **options,
+            "settings": [{**options["settings"][0], **settings}],
+        },
+    }
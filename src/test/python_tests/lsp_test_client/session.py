@@ -5,10 +5,13 @@ LSP session client for testing.
 """
 
 import os
+import queue
 import subprocess
 import sys
+import time
+from collections import defaultdict
 from concurrent.futures import Future, ThreadPoolExecutor
-from threading import Event
+from threading import Event, Lock
 
 from pylsp_jsonrpc.dispatchers import MethodDispatcher
 from pylsp_jsonrpc.endpoint import Endpoint
@@ -18,6 +21,7 @@ from .constants import PROJECT_ROOT
 from .defaults import VSCODE_DEFAULT_INITIALIZE
 
 LSP_EXIT_TIMEOUT = 5000
+SERVER_POLL_INTERVAL = 0.5  # seconds
 
 
 PUBLISH_DIAGNOSTICS = "textDocument/publishDiagnostics"
@@ -36,6 +40,8 @@ class LspSession(MethodDispatcher):
         self._reader = None
         self._endpoint = None
         self._notification_callbacks = {}
+        self._diagnostics = defaultdict(queue.Queue)
+        self._diagnostics_lock = Lock()
         self.script = (
             script if script else (PROJECT_ROOT / "bundled" / "tool" / "lsp_server.py")
         )
@@ -171,8 +177,31 @@ class LspSession(MethodDispatcher):
 
             return _default_handler
 
+    def next_diagnostics(self, uri, timeout=None):
+        """Returns the next diagnostics published for `uri` that has not been
+        returned yet, or None on timeout or once the server has exited."""
+        with self._diagnostics_lock:
+            diagnostics = self._diagnostics[uri]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = SERVER_POLL_INTERVAL
+            if deadline is not None:
+                wait = max(min(wait, deadline - time.monotonic()), 0)
+            try:
+                return diagnostics.get(timeout=wait)
+            except queue.Empty:
+                pass
+            # A crashed server will never publish, don't wait out the timeout.
+            if self._sub.poll() is not None:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
     def _publish_diagnostics(self, publish_diagnostics_params):
         """Internal handler for text document publish diagnostics."""
+        with self._diagnostics_lock:
+            diagnostics = self._diagnostics[publish_diagnostics_params["uri"]]
+        diagnostics.put(publish_diagnostics_params)
         return self._handle_notification(
             PUBLISH_DIAGNOSTICS, publish_diagnostics_params
         )
@@ -8,7 +8,8 @@ import json
 import os
 import pathlib
 import platform
-import random
+import tempfile
+from typing import Union
 
 from .constants import PROJECT_ROOT
 
@@ -20,7 +21,7 @@ def normalizecase(path: str) -> str:
     return path
 
 
-def as_uri(path: str) -> str:
+def as_uri(path: Union[str, os.PathLike]) -> str:
     """Return 'file' uri as string."""
     return normalizecase(pathlib.Path(path).as_uri())
 
@@ -28,11 +29,11 @@ def as_uri(path: str) -> str:
 @contextlib.contextmanager
 def python_file(contents: str, root: pathlib.Path, ext: str = ".py"):
     """Creates a temporary python file."""
+    # mkstemp picks a name no other test or xdist worker is using.
+    fd, name = tempfile.mkstemp(suffix=ext, dir=str(root))
+    os.close(fd)
+    fullpath = pathlib.Path(name)
     try:
-        basename = (
-            "".join(random.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(9)) + ext
-        )
-        fullpath = root / basename
         fullpath.write_text(contents)
         yield fullpath
     finally:
@@ -61,7 +62,7 @@ def get_initialization_options():
         value = properties[prop]["default"]
         setting[name] = value
 
-    setting["workspace"] = as_uri(str(PROJECT_ROOT))
+    setting["workspace"] = as_uri(PROJECT_ROOT)
     setting["interpreter"] = []
 
     return {"settings": [setting], "globalSettings": setting}
@@ -2,43 +2,81 @@
 Test for path and interpreter settings.
 """
 
-import copy
+import sys
 
 from hamcrest import assert_that, is_
 
 from .lsp_test_client import constants, defaults, session, utils
 
 TEST_FILE = constants.TEST_DATA / "sample1" / "sample.py"
+UNSORTED_FILE_CONTENTS = (TEST_FILE.parent / "sample.unformatted").read_text()
+TIMEOUT = 10  # 10 seconds
 
 
 class CallbackObject:
     """Object that holds results for WINDOW_LOG_MESSAGE to capture argv"""
 
     def __init__(self):
-        self.result = False
+        self.result = 0
+        self.runs = 0
+        self.messages = []
 
     def check_result(self):
-        """returns Boolean result"""
+        """returns number of log messages with duplicated argv"""
         return self.result
 
     def check_for_argv_duplication(self, argv):
-        """checks if argv duplication exists and sets result boolean"""
-        if argv["type"] == 4 and argv["message"].split().count("--from-stdin") > 1:
-            self.result = True
+        """checks if argv duplication exists and counts it"""
+        self.messages.append(argv)
+        if argv["type"] != 4:
+            return
+        # The server appends `--filename` to every isort run it logs.
+        count = argv["message"].count(" --filename ")
+        self.runs += count > 0
+        if count > 1:
+            self.result += 1
+
+
+def _lint_twice(ls_session, uri):
+    """Opens the document, then edits and saves it so that isort runs twice."""
+    ls_session.notify_did_open(
+        {
+            "textDocument": {
+                "uri": uri,
+                "languageId": "python",
+                "version": 1,
+                "text": UNSORTED_FILE_CONTENTS,
+            }
+        }
+    )
+    first = ls_session.next_diagnostics(uri, TIMEOUT)
+
+    # Change the text, so the save is linted on its own instead of being merged
+    # with the open or answered from the cached result.
+    ls_session.notify_did_change(
+        {
+            "textDocument": {"uri": uri, "version": 2},
+            "contentChanges": [{"text": UNSORTED_FILE_CONTENTS + "\n"}],
+        }
+    )
+    ls_session.notify_did_save({"textDocument": {"uri": uri, "version": 2}})
+    second = ls_session.next_diagnostics(uri, TIMEOUT)
+    return first, second
+
+
+def _sources(diagnostics):
+    return [d["source"] for d in diagnostics["diagnostics"]]
 
 
 def test_path():
     """Test linting using isort bin path set."""
 
-    init_params = copy.deepcopy(defaults.VSCODE_DEFAULT_INITIALIZE)
-    init_params["initializationOptions"]["settings"][0]["path"] = ["isort"]
+    init_params = defaults.initialize_params(check=True, path=["isort"])
 
     argv_callback_object = CallbackObject()
-    contents = TEST_FILE.read_text()
 
-    actual = []
-    with utils.python_file(contents, TEST_FILE.parent) as file:
-        uri = utils.as_uri(str(file))
+    with utils.python_file(UNSORTED_FILE_CONTENTS, TEST_FILE.parent) as file:
+        uri = utils.as_uri(file)
 
         with session.LspSession() as ls_session:
             ls_session.set_notification_callback(
@@ -47,45 +85,59 @@ def test_path():
             )
 
             ls_session.initialize(init_params)
-            ls_session.notify_did_open(
-                {
-                    "textDocument": {
-                        "uri": uri,
-                        "languageId": "python",
-                        "version": 1,
-                        "text": contents,
-                    }
-                }
-            )
+            results = _lint_twice(ls_session, uri)
+
+    assert_that([_sources(r) for r in results], is_([["isort"], ["isort"]]))
+    assert_that(argv_callback_object.runs, is_(2))
+    assert_that(argv_callback_object.check_result(), is_(0))
+
+
+def test_path_module():
+    """Test linting using isort run as a module from path."""
+
+    init_params = defaults.initialize_params(
+        check=True, path=[sys.executable, "-m", "isort"]
+    )
 
-            # Call this second time to detect arg duplication.
-            ls_session.notify_did_open(
-                {
-                    "textDocument": {
-                        "uri": uri,
-                        "languageId": "python",
-                        "version": 1,
-                        "text": contents,
-                    }
-                }
+    argv_callback_object = CallbackObject()
+
+    with utils.python_file(UNSORTED_FILE_CONTENTS, TEST_FILE.parent) as file:
+        uri = utils.as_uri(file)
+
+        with session.LspSession() as ls_session:
+            ls_session.set_notification_callback(
+                session.WINDOW_LOG_MESSAGE,
+                argv_callback_object.check_for_argv_duplication,
             )
 
-            actual = argv_callback_object.check_result()
+            ls_session.initialize(init_params)
+            results = _lint_twice(ls_session, uri)
+
+    assert_that([_sources(r) for r in results], is_([["isort"], ["isort"]]))
 
-    assert_that(actual, is_(False))
+    # isort ran through the JSON-RPC runner, without falling back to 'path'.
+    rpc_runs = [
+        m["message"]
+        for m in argv_callback_object.messages
+        if m["type"] == 4
+        and m["message"].startswith(f"{sys.executable} -m isort - ")
+        and "--check" in m["message"]
+    ]
+    warnings = [m for m in argv_callback_object.messages if m["type"] <= 2]
+    assert_that(len(rpc_runs), is_(2))
+    assert_that(warnings, is_([]))
+    assert_that(argv_callback_object.runs, is_(2))
+    assert_that(argv_callback_object.check_result(), is_(0))
 
 
 def test_interpreter():
     """Test linting using specific python path."""
-    init_params = copy.deepcopy(defaults.VSCODE_DEFAULT_INITIALIZE)
-    init_params["initializationOptions"]["settings"][0]["interpreter"] = ["python"]
+    init_params = defaults.initialize_params(check=True, interpreter=["python"])
 
     argv_callback_object = CallbackObject()
-    contents = TEST_FILE.read_text()
 
-    actual = []
-    with utils.python_file(contents, TEST_FILE.parent) as file:
-        uri = utils.as_uri(str(file))
+    with utils.python_file(UNSORTED_FILE_CONTENTS, TEST_FILE.parent) as file:
+        uri = utils.as_uri(file)
 
         with session.LspSession() as ls_session:
             ls_session.set_notification_callback(
@@ -94,29 +146,8 @@ def test_interpreter():
             )
 
             ls_session.initialize(init_params)
-            ls_session.notify_did_open(
-                {
-                    "textDocument": {
-                        "uri": uri,
-                        "languageId": "python",
-                        "version": 1,
-                        "text": contents,
-                    }
-                }
-            )
-
-            # Call this second time to detect arg duplication.
-            ls_session.notify_did_open(
-                {
-                    "textDocument": {
-                        "uri": uri,
-                        "languageId": "python",
-                        "version": 1,
-                        "text": contents,
-                    }
-                }
-            )
-
-            actual = argv_callback_object.check_result()
+            results = _lint_twice(ls_session, uri)
 
-    assert_that(actual, is_(False))
+    assert_that([_sources(r) for r in results], is_([["isort"], ["isort"]]))
+    assert_that(argv_callback_object.runs, is_(2))
+    assert_that(argv_callback_object.check_result(), is_(0))
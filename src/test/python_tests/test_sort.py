@@ -3,18 +3,167 @@
 """
 Test for formatting over LSP.
 """
-import copy
-import os
-from threading import Event
+import contextlib
+import pathlib
+import tempfile
 
 import pytest
-from hamcrest import assert_that, is_
 
 from .lsp_test_client import constants, defaults, session, utils
 
 FORMATTER = utils.get_server_info_defaults()
 TIMEOUT = 10  # 10 seconds
 
+SAMPLE1_DIR = constants.TEST_DATA / "sample1"
+SAMPLE2_DIR = constants.TEST_DATA / "sample2"
+
+# Read once: the contents are shared by every parametrization below.
+SAMPLE1_FORMATTED = (SAMPLE1_DIR / "sample.py").read_text()
+SAMPLE1_UNFORMATTED = (SAMPLE1_DIR / "sample.unformatted").read_text()
+SAMPLE2_FORMATTED = (SAMPLE2_DIR / "sample.formatted").read_text()
+SAMPLE2_UNFORMATTED = (SAMPLE2_DIR / "sample.unformatted").read_text()
+
+# read_text() universalizes line endings to '\n', build the variants up front.
+LINE_ENDINGS = ("\n", "\r\n")
+SAMPLE1_BY_LINE_ENDING = {
+    le: (SAMPLE1_UNFORMATTED.replace("\n", le), SAMPLE1_FORMATTED.replace("\n", le))
+    for le in LINE_ENDINGS
+}
+SAMPLE2_BY_LINE_ENDING = {
+    le: (SAMPLE2_UNFORMATTED.replace("\n", le), SAMPLE2_FORMATTED.replace("\n", le))
+    for le in LINE_ENDINGS
+}
+
+# Organize import case: (sample variants by line ending, last line of the edit).
+ORGANIZE_IMPORT_CASES = {
+    "py": (SAMPLE1_BY_LINE_ENDING, 3),
+    "cell": (SAMPLE2_BY_LINE_ENDING, 4),
+}
+
+
+SORT_DIAGNOSTIC = {
+    "range": {
+        "start": {"line": 0, "character": 0},
+        "end": {"line": 1, "character": 0},
+    },
+    "message": "Imports are incorrectly sorted and/or formatted.",
+    "severity": 4,
+    "code": "E",
+    "source": "isort",
+}
+
+
+def _expected_diagnostics(uri):
+    return {"uri": uri, "diagnostics": [SORT_DIAGNOSTIC]}
+
+
+def _organize_imports_action(uri, end_line=None, new_text=None):
+    action = {
+        "title": "isort: Organize Imports",
+        "kind": "source.organizeImports",
+        "diagnostics": [],
+    }
+    if new_text is not None:
+        action["edit"] = {
+            "documentChanges": [
+                {
+                    "textDocument": {"uri": uri, "version": 1},
+                    "edits": [
+                        {
+                            "range": {
+                                "start": {"line": 0, "character": 0},
+                                "end": {"line": end_line, "character": 0},
+                            },
+                            "newText": new_text,
+                        }
+                    ],
+                }
+            ]
+        }
+    action["data"] = uri
+    return action
+
+
+def _fix_sort_action(uri):
+    return {
+        "title": "isort: Fix import sorting and/or formatting",
+        "kind": "quickfix",
+        "diagnostics": [SORT_DIAGNOSTIC],
+        "data": uri,
+    }
+
+
+def _code_action_params(published, **context):
+    # Like a real client, send back the diagnostics the server published.
+    uri = published["uri"]
+    return {
+        "textDocument": {"uri": uri},
+        "range": {
+            "start": {"line": 0, "character": 0},
+            "end": {"line": 0, "character": 0},
+        },
+        "context": {"diagnostics": published["diagnostics"], **context},
+    }
+
+
+@pytest.fixture(scope="module")
+def ls_session():
+    """Language server shared by the tests that run with sort checking enabled."""
+    init_params = defaults.initialize_params(check=True)
+
+    with session.LspSession() as ls:
+        ls.initialize(init_params)
+        yield ls
+
+
+def _close_document(ls_session, uri):
+    # Drop diagnostics still queued for the uri (organize imports clears them
+    # too), then consume the ones cleared on close so the uri can be reopened.
+    while ls_session.next_diagnostics(uri, 0) is not None:
+        pass
+    ls_session.notify_did_close({"textDocument": {"uri": uri}})
+    ls_session.next_diagnostics(uri, TIMEOUT)
+
+
+@pytest.fixture(scope="module")
+def sample_uris():
+    """Uris for the organize import cases, backed by files created once. The
+    server lints the opened text, so one file serves every line ending."""
+    with contextlib.ExitStack() as stack:
+        py_file = stack.enter_context(
+            utils.python_file(SAMPLE1_UNFORMATTED, SAMPLE1_DIR)
+        )
+        notebook = stack.enter_context(utils.python_file("", SAMPLE2_DIR, ".ipynb"))
+        yield {
+            "py": utils.as_uri(py_file),
+            # generate a fake cell uri
+            "cell": utils.as_uri(notebook).replace("file:", "vscode-notebook-cell:")
+            + "#C00001",
+        }
+
+
+@pytest.fixture(scope="module")
+def opened_sample1(ls_session):
+    """Unsorted sample1 opened once for the code action cases, which only vary
+    the request."""
+    with utils.python_file(SAMPLE1_UNFORMATTED, SAMPLE1_DIR) as pf:
+        uri = utils.as_uri(pf)
+
+        ls_session.notify_did_open(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": SAMPLE1_UNFORMATTED,
+                }
+            }
+        )
+        try:
+            yield uri, ls_session.next_diagnostics(uri, TIMEOUT)
+        finally:
+            _close_document(ls_session, uri)
+
 
 @pytest.mark.parametrize(
     "action_type",
@@ -26,540 +175,166 @@ TIMEOUT = 10  # 10 seconds
         "",
     ],
 )
-def test_code_actions(action_type):
+def test_code_actions(ls_session, opened_sample1, action_type):
     """Test code actions."""
-    init_params = copy.deepcopy(defaults.VSCODE_DEFAULT_INITIALIZE)
-    init_params["initializationOptions"]["settings"][0]["check"] = True
-
-    FORMATTED_TEST_FILE_PATH = constants.TEST_DATA / "sample1" / "sample.py"
-    UNFORMATTED_TEST_FILE_PATH = constants.TEST_DATA / "sample1" / "sample.unformatted"
-
-    contents = UNFORMATTED_TEST_FILE_PATH.read_text()
-    expected = FORMATTED_TEST_FILE_PATH.read_text()
-
-    actual_diagnostics = []
-
-    with utils.python_file(contents, UNFORMATTED_TEST_FILE_PATH.parent) as pf:
-        uri = utils.as_uri(str(pf))
-
-        with session.LspSession() as ls_session:
-            ls_session.initialize(init_params)
-
-            done = Event()
-
-            def _handler(params):
-                nonlocal actual_diagnostics
-                actual_diagnostics = params
-                done.set()
-
-            ls_session.set_notification_callback(session.PUBLISH_DIAGNOSTICS, _handler)
-
-            ls_session.notify_did_open(
-                {
-                    "textDocument": {
-                        "uri": uri,
-                        "languageId": "python",
-                        "version": 1,
-                        "text": contents,
-                    }
+    uri, actual_diagnostics = opened_sample1
+    assert actual_diagnostics == _expected_diagnostics(uri)
+
+    only = None
+    if action_type in ("quickfix", "source.organizeImports", ""):
+        only = [action_type]
+    else:
+        only = action_type
+    actual_code_actions = ls_session.text_document_code_action(
+        _code_action_params(actual_diagnostics, only=only)
+    )
+
+    if action_type is None or action_type == (
+        "quickfix",
+        "source.organizeImports",
+    ):
+        assert actual_code_actions == [
+            _organize_imports_action(uri),
+            _fix_sort_action(uri),
+        ]
+    elif action_type == "":
+        assert actual_code_actions is None
+    elif action_type == "quickfix":
+        assert actual_code_actions == [_fix_sort_action(uri)]
+    elif action_type == "source.organizeImports":
+        assert actual_code_actions == [
+            _organize_imports_action(uri, 3, SAMPLE1_FORMATTED)
+        ]
+    else:
+        assert False, "Invalid action type"
+
+
+@pytest.mark.parametrize("line_ending", LINE_ENDINGS)
+@pytest.mark.parametrize("case", ORGANIZE_IMPORT_CASES)
+def test_organize_import(ls_session, sample_uris, case, line_ending):
+    """Test organizing imports in a python file and in a notebook cell."""
+    samples, end_line = ORGANIZE_IMPORT_CASES[case]
+    contents, expected = samples[line_ending]
+    uri = sample_uris[case]
+
+    try:
+        ls_session.notify_did_open(
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "python",
+                    "version": 1,
+                    "text": contents,
                 }
-            )
-
-            # wait for some time to receive all notifications
-            done.wait(TIMEOUT)
-
-            assert_that(
-                actual_diagnostics,
-                is_(
-                    {
-                        "uri": uri,
-                        "diagnostics": [
-                            {
-                                "range": {
-                                    "start": {"line": 0, "character": 0},
-                                    "end": {"line": 1, "character": 0},
-                                },
-                                "message": "Imports are incorrectly sorted and/or formatted.",
-                                "severity": 4,
-                                "code": "E",
-                                "source": "isort",
-                            }
-                        ],
-                    }
-                ),
-            )
-
-            only = None
-            if action_type in ("quickfix", "source.organizeImports", ""):
-                only = [action_type]
-            else:
-                only = action_type
-            actual_code_actions = ls_session.text_document_code_action(
-                {
-                    "textDocument": {"uri": uri},
-                    "range": {
-                        "start": {"line": 0, "character": 0},
-                        "end": {"line": 0, "character": 0},
-                    },
-                    "context": {
-                        "diagnostics": [
-                            {
-                                "range": {
-                                    "start": {"line": 0, "character": 0},
-                                    "end": {"line": 1, "character": 0},
-                                },
-                                "message": "Imports are incorrectly sorted and/or formatted.",
-                                "severity": 4,
-                                "code": "E",
-                                "source": "isort",
-                            }
-                        ],
-                        "only": only,
-                    },
-                },
-            )
-
-            if action_type is None or action_type == (
-                "quickfix",
-                "source.organizeImports",
-            ):
-                assert_that(
-                    actual_code_actions,
-                    is_(
-                        [
-                            {
-                                "title": "isort: Organize Imports",
-                                "kind": "source.organizeImports",
-                                "diagnostics": [],
-                                "data": uri,
-                            },
-                            {
-                                "title": "isort: Fix import sorting and/or formatting",
-                                "kind": "quickfix",
-                                "diagnostics": [
-                                    {
-                                        "range": {
-                                            "start": {"line": 0, "character": 0},
-                                            "end": {"line": 1, "character": 0},
-                                        },
-                                        "message": "Imports are incorrectly sorted and/or formatted.",
-                                        "severity": 4,
-                                        "code": "E",
-                                        "source": "isort",
-                                    }
-                                ],
-                                "data": uri,
-                            },
-                        ]
-                    ),
-                )
-            elif action_type == "":
-                assert_that(actual_code_actions, is_(None))
-            elif action_type == "quickfix":
-                assert_that(
-                    actual_code_actions,
-                    is_(
-                        [
-                            {
-                                "title": "isort: Fix import sorting and/or formatting",
-                                "kind": "quickfix",
-                                "diagnostics": [
-                                    {
-                                        "range": {
-                                            "start": {"line": 0, "character": 0},
-                                            "end": {"line": 1, "character": 0},
-                                        },
-                                        "message": "Imports are incorrectly sorted and/or formatted.",
-                                        "severity": 4,
-                                        "code": "E",
-                                        "source": "isort",
-                                    }
-                                ],
-                                "data": uri,
-                            },
-                        ]
-                    ),
-                )
-            elif action_type == "source.organizeImports":
-                assert_that(
-                    actual_code_actions,
-                    is_(
-                        [
-                            {
-                                "title": "isort: Organize Imports",
-                                "kind": "source.organizeImports",
-                                "diagnostics": [],
-                                "edit": {
-                                    "documentChanges": [
-                                        {
-                                            "textDocument": {"uri": uri, "version": 1},
-                                            "edits": [
-                                                {
-                                                    "range": {
-                                                        "start": {
-                                                            "line": 0,
-                                                            "character": 0,
-                                                        },
-                                                        "end": {
-                                                            "line": 3,
-                                                            "character": 0,
-                                                        },
-                                                    },
-                                                    "newText": expected,
-                                                }
-                                            ],
-                                        }
-                                    ]
-                                },
-                                "data": uri,
-                            }
-                        ]
-                    ),
-                )
-            else:
-                assert False, "Invalid action type"
-
-
-@pytest.mark.parametrize("line_ending", ["\n", "\r\n"])
-def test_organize_import(line_ending):
-    """Test formatting a python file."""
-    init_params = copy.deepcopy(defaults.VSCODE_DEFAULT_INITIALIZE)
-    init_params["initializationOptions"]["settings"][0]["check"] = True
-
-    FORMATTED_TEST_FILE_PATH = constants.TEST_DATA / "sample1" / "sample.py"
-    UNFORMATTED_TEST_FILE_PATH = constants.TEST_DATA / "sample1" / "sample.unformatted"
-
-    contents = UNFORMATTED_TEST_FILE_PATH.read_text()
-    expected = FORMATTED_TEST_FILE_PATH.read_text()
-
-    # "contents" will have universalized line ending i.e '\n'.
-    # update it as needed for the test
-    contents = contents.replace("\n", line_ending)
-    expected = expected.replace("\n", line_ending)
-
-    actual_diagnostics = []
-
-    with utils.python_file(contents, UNFORMATTED_TEST_FILE_PATH.parent) as pf:
-        uri = utils.as_uri(str(pf))
+            }
+        )
 
-        with session.LspSession() as ls_session:
-            ls_session.initialize(init_params)
+        actual_diagnostics = ls_session.next_diagnostics(uri, TIMEOUT)
 
-            done = Event()
+        assert actual_diagnostics == _expected_diagnostics(uri)
 
-            def _handler(params):
-                nonlocal actual_diagnostics
-                actual_diagnostics = params
-                done.set()
+        actual_code_actions = ls_session.text_document_code_action(
+            _code_action_params(actual_diagnostics)
+        )
 
-            ls_session.set_notification_callback(session.PUBLISH_DIAGNOSTICS, _handler)
+        assert actual_code_actions == [
+            _organize_imports_action(uri),
+            _fix_sort_action(uri),
+        ]
 
-            ls_session.notify_did_open(
-                {
-                    "textDocument": {
-                        "uri": uri,
-                        "languageId": "python",
-                        "version": 1,
-                        "text": contents,
-                    }
-                }
-            )
+        actual_resolved_code_action = ls_session.code_action_resolve(
+            actual_code_actions[0]
+        )
+        assert actual_resolved_code_action == _organize_imports_action(
+            uri, end_line, expected
+        )
+    finally:
+        _close_document(ls_session, uri)
 
-            # wait for some time to receive all notifications
-            done.wait(TIMEOUT)
 
-            assert_that(
-                actual_diagnostics,
-                is_(
-                    {
-                        "uri": uri,
-                        "diagnostics": [
-                            {
-                                "range": {
-                                    "start": {"line": 0, "character": 0},
-                                    "end": {"line": 1, "character": 0},
-                                },
-                                "message": "Imports are incorrectly sorted and/or formatted.",
-                                "severity": 4,
-                                "code": "E",
-                                "source": "isort",
-                            }
-                        ],
-                    }
-                ),
-            )
+def test_config_change(ls_session):
+    """Test that edits to the isort config apply to an already open document."""
+    contents = "from x import b, c\n"
 
-            actual_code_actions = ls_session.text_document_code_action(
-                {
-                    "textDocument": {"uri": uri},
-                    "range": {
-                        "start": {"line": 0, "character": 0},
-                        "end": {"line": 0, "character": 0},
-                    },
-                    "context": {
-                        "diagnostics": [
-                            {
-                                "range": {
-                                    "start": {"line": 0, "character": 0},
-                                    "end": {"line": 1, "character": 0},
-                                },
-                                "message": "Imports are incorrectly sorted and/or formatted.",
-                                "severity": 4,
-                                "code": "E",
-                                "source": "isort",
-                            }
-                        ]
-                    },
-                }
-            )
+    # Check is only enabled for files inside the workspace.
+    with tempfile.TemporaryDirectory(dir=constants.TEST_DATA) as config_dir:
+        config_file = pathlib.Path(config_dir) / ".isort.cfg"
+        with utils.python_file(contents, pathlib.Path(config_dir)) as pf:
+            uri = utils.as_uri(pf)
 
-            assert_that(
-                actual_code_actions,
-                is_(
-                    [
-                        {
-                            "title": "isort: Organize Imports",
-                            "kind": "source.organizeImports",
-                            "diagnostics": [],
-                            "data": uri,
-                        },
-                        {
-                            "title": "isort: Fix import sorting and/or formatting",
-                            "kind": "quickfix",
-                            "diagnostics": [
-                                {
-                                    "range": {
-                                        "start": {"line": 0, "character": 0},
-                                        "end": {"line": 1, "character": 0},
-                                    },
-                                    "message": "Imports are incorrectly sorted and/or formatted.",
-                                    "severity": 4,
-                                    "code": "E",
-                                    "source": "isort",
-                                }
-                            ],
-                            "data": uri,
-                        },
-                    ]
-                ),
-            )
-
-            actual_resolved_code_action = ls_session.code_action_resolve(
-                actual_code_actions[0]
-            )
-            assert_that(
-                actual_resolved_code_action,
-                is_(
+            try:
+                ls_session.notify_did_open(
                     {
-                        "title": "isort: Organize Imports",
-                        "kind": "source.organizeImports",
-                        "diagnostics": [],
-                        "edit": {
-                            "documentChanges": [
-                                {
-                                    "textDocument": {
-                                        "uri": uri,
-                                        "version": 1,
-                                    },
-                                    "edits": [
-                                        {
-                                            "range": {
-                                                "start": {"line": 0, "character": 0},
-                                                "end": {"line": 3, "character": 0},
-                                            },
-                                            "newText": expected,
-                                        }
-                                    ],
-                                }
-                            ]
-                        },
-                        "data": uri,
+                        "textDocument": {
+                            "uri": uri,
+                            "languageId": "python",
+                            "version": 1,
+                            "text": contents,
+                        }
                     }
-                ),
-            )
-
-
-@pytest.mark.parametrize("line_ending", ["\n", "\r\n"])
-def test_organize_import_cell(line_ending):
-    """Test formatting a python file."""
-    init_params = copy.deepcopy(defaults.VSCODE_DEFAULT_INITIALIZE)
-    init_params["initializationOptions"]["settings"][0]["check"] = True
-
-    FORMATTED_TEST_FILE_PATH = constants.TEST_DATA / "sample2" / "sample.formatted"
-    UNFORMATTED_TEST_FILE_PATH = constants.TEST_DATA / "sample2" / "sample.unformatted"
-
-    contents = UNFORMATTED_TEST_FILE_PATH.read_text()
-    expected = FORMATTED_TEST_FILE_PATH.read_text()
+                )
 
-    # "contents" will have universalized line ending i.e '\n'.
-    # update it as needed for the test
-    contents = contents.replace("\n", line_ending)
-    expected = expected.replace("\n", line_ending)
+                actual_diagnostics = ls_session.next_diagnostics(uri, TIMEOUT)
+                assert actual_diagnostics == {"uri": uri, "diagnostics": []}
 
-    actual_diagnostics = []
-    with utils.python_file("", UNFORMATTED_TEST_FILE_PATH.parent, ".ipynb") as pf:
-        # generate a fake cell uri
-        uri = utils.as_uri(pf).replace("file:", "vscode-notebook-cell:") + "#C00001"
-        with session.LspSession() as ls_session:
-            ls_session.initialize(init_params)
+                config_file.write_text("[settings]\nforce_single_line = true\n")
+                ls_session.notify_did_save({"textDocument": {"uri": uri}})
 
-            done = Event()
+                actual_diagnostics = ls_session.next_diagnostics(uri, TIMEOUT)
+                assert actual_diagnostics == _expected_diagnostics(uri)
 
-            def _handler(params):
-                nonlocal actual_diagnostics
-                actual_diagnostics = params
-                done.set()
+                actual_resolved_code_action = ls_session.code_action_resolve(
+                    _organize_imports_action(uri)
+                )
+                assert actual_resolved_code_action == _organize_imports_action(
+                    uri, 1, "from x import b\nfrom x import c\n"
+                )
+            finally:
+                _close_document(ls_session, uri)
 
-            ls_session.set_notification_callback(session.PUBLISH_DIAGNOSTICS, _handler)
 
-            ls_session.notify_did_open(
-                {
-                    "textDocument": {
-                        "uri": uri,
-                        "languageId": "python",
-                        "version": 1,
-                        "text": contents,
-                    }
-                }
-            )
+def test_add_imports_without_imports(ls_session):
+    """Test that files without imports are checked against `add_imports`."""
+    contents = "x = 1\n"
 
-            # wait for some time to receive all notifications
-            done.wait(TIMEOUT)
+    # Check is only enabled for files inside the workspace.
+    with tempfile.TemporaryDirectory(dir=constants.TEST_DATA) as config_dir:
+        config_file = pathlib.Path(config_dir) / ".isort.cfg"
+        config_file.write_text(
+            "[settings]\nadd_imports = from __future__ import annotations\n"
+        )
+        with utils.python_file(contents, pathlib.Path(config_dir)) as pf:
+            uri = utils.as_uri(pf)
 
-            assert_that(
-                actual_diagnostics,
-                is_(
+            try:
+                ls_session.notify_did_open(
                     {
-                        "uri": uri,
-                        "diagnostics": [
-                            {
-                                "range": {
-                                    "start": {"line": 0, "character": 0},
-                                    "end": {"line": 1, "character": 0},
-                                },
-                                "message": "Imports are incorrectly sorted and/or formatted.",
-                                "severity": 4,
-                                "code": "E",
-                                "source": "isort",
-                            }
-                        ],
+                        "textDocument": {
+                            "uri": uri,
+                            "languageId": "python",
+                            "version": 1,
+                            "text": contents,
+                        }
                     }
-                ),
-            )
+                )
 
-            actual_code_actions = ls_session.text_document_code_action(
-                {
-                    "textDocument": {"uri": uri},
-                    "range": {
-                        "start": {"line": 0, "character": 0},
-                        "end": {"line": 0, "character": 0},
-                    },
-                    "context": {
-                        "diagnostics": [
-                            {
-                                "range": {
-                                    "start": {"line": 0, "character": 0},
-                                    "end": {"line": 1, "character": 0},
-                                },
-                                "message": "Imports are incorrectly sorted and/or formatted.",
-                                "severity": 4,
-                                "code": "E",
-                                "source": "isort",
-                            }
-                        ]
-                    },
-                }
-            )
-
-            assert_that(
-                actual_code_actions,
-                is_(
-                    [
-                        {
-                            "title": "isort: Organize Imports",
-                            "kind": "source.organizeImports",
-                            "diagnostics": [],
-                            "data": uri,
-                        },
-                        {
-                            "title": "isort: Fix import sorting and/or formatting",
-                            "kind": "quickfix",
-                            "diagnostics": [
-                                {
-                                    "range": {
-                                        "start": {"line": 0, "character": 0},
-                                        "end": {"line": 1, "character": 0},
-                                    },
-                                    "message": "Imports are incorrectly sorted and/or formatted.",
-                                    "severity": 4,
-                                    "code": "E",
-                                    "source": "isort",
-                                }
-                            ],
-                            "data": uri,
-                        },
-                    ]
-                ),
-            )
-
-            actual_resolved_code_action = ls_session.code_action_resolve(
-                actual_code_actions[0]
-            )
-            assert_that(
-                actual_resolved_code_action,
-                is_(
-                    {
-                        "title": "isort: Organize Imports",
-                        "kind": "source.organizeImports",
-                        "diagnostics": [],
-                        "edit": {
-                            "documentChanges": [
-                                {
-                                    "textDocument": {
-                                        "uri": uri,
-                                        "version": 1,
-                                    },
-                                    "edits": [
-                                        {
-                                            "range": {
-                                                "start": {"line": 0, "character": 0},
-                                                "end": {"line": 4, "character": 0},
-                                            },
-                                            "newText": expected,
-                                        }
-                                    ],
-                                }
-                            ]
-                        },
-                        "data": uri,
-                    }
-                ),
-            )
+                actual_diagnostics = ls_session.next_diagnostics(uri, TIMEOUT)
+                assert actual_diagnostics == _expected_diagnostics(uri)
+            finally:
+                _close_document(ls_session, uri)
 
 
 def test_check_disabled():
     """Test sort checking disabled."""
-    init_params = copy.deepcopy(defaults.VSCODE_DEFAULT_INITIALIZE)
-    init_params["initializationOptions"]["settings"][0]["check"] = False
+    init_params = defaults.initialize_params(check=False)
 
-    UNFORMATTED_TEST_FILE_PATH = constants.TEST_DATA / "sample1" / "sample.unformatted"
-    uri = utils.as_uri(os.fspath(UNFORMATTED_TEST_FILE_PATH))
+    uri = utils.as_uri(SAMPLE1_DIR / "sample.unformatted")
 
-    contents = UNFORMATTED_TEST_FILE_PATH.read_text()
-    actual_diagnostics = []
+    contents = SAMPLE1_UNFORMATTED
 
     with session.LspSession() as ls_session:
         ls_session.initialize(init_params)
 
-        done = Event()
-
-        def _handler(params):
-            nonlocal actual_diagnostics
-            actual_diagnostics = params
-            done.set()
-
-        ls_session.set_notification_callback(session.PUBLISH_DIAGNOSTICS, _handler)
-
         ls_session.notify_did_open(
             {
                 "textDocument": {
@@ -571,7 +346,6 @@ def test_check_disabled():
             }
         )
 
-        # wait for some time to receive all notifications
-        done.wait(TIMEOUT)
+        actual_diagnostics = ls_session.next_diagnostics(uri, TIMEOUT)
 
-        assert_that(actual_diagnostics, is_({"uri": uri, "diagnostics": []}))
+        assert actual_diagnostics == {"uri": uri, "diagnostics": []}